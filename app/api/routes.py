@@ -1,6 +1,9 @@
-from fastapi import APIRouter, HTTPException, status
+import orjson
+from hashlib import blake2b
+from fastapi import APIRouter, HTTPException, Response, status
 from typing import List
 from celery import Celery
+from starlette.concurrency import run_in_threadpool
 
 from app.api.schemas import (
     EnvironmentResponse,
@@ -8,6 +11,7 @@ from app.api.schemas import (
     ExecuteResponse,
 )
 from app.config import settings
+from app.core.redis_client import async_redis_client
 
 
 router = APIRouter(prefix="/api/v1", tags=["Code Execution"])
@@ -19,54 +23,118 @@ celery_app = Celery(
     backend=settings.celery_result_backend,
 )
 
+celery_app.conf.update(
+    # Must match the worker (app/worker/celery_app.py)
+    task_serializer="msgpack",
+    accept_content=["msgpack", "json"],
+    result_serializer="msgpack",
+    broker_pool_limit=settings.celery_broker_pool_limit,
+    broker_transport_options={
+        "socket_keepalive": True,
+        "health_check_interval": 30,
+    },
+)
+
+# Max seconds to wait for a free producer from the broker pool
+PRODUCER_ACQUIRE_TIMEOUT = 5.0
+
+# Task signatures, built once (tasks module is not imported here)
+EXECUTE_CODE = celery_app.signature("app.worker.tasks.execute_code")
+
+# Environments are fixed after startup, so serialize the listing once
+ENVIRONMENTS_JSON = orjson.dumps(
+    [env.model_dump() for env in settings.environments_data]
+)
+ENVIRONMENTS_HEADERS = {"Cache-Control": "public, max-age=3600"}
+
+# Redis result backend wakes `AsyncResult.get()` via pub/sub on
+# celery-task-meta-<id>; the interval only applies to polling backends.
+RESULT_POLL_INTERVAL = 0.05
+
+
+def _run_execute_task(args: list) -> dict:
+    """Send execute_code task and wait for its result."""
+    with celery_app.producer_pool.acquire(block=True, timeout=PRODUCER_ACQUIRE_TIMEOUT) as producer:
+        async_result = EXECUTE_CODE.apply_async(args=args, producer=producer)
+    return async_result.get(
+        timeout=settings.execution_timeout + 30,
+        interval=RESULT_POLL_INTERVAL,
+    )
+
+
+def _execution_cache_key(request: ExecuteRequest) -> str:
+    """Hash everything that affects the execution output."""
+    payload = orjson.dumps(
+        [request.environment, request.code, request.stdin, request.filename]
+    )
+    return blake2b(payload, digest_size=16).hexdigest()
+
 
 @router.get("/environments", response_model=List[EnvironmentResponse])
 async def list_environments():
     """
     Get list of available execution environments
     """
-    return settings.environments_data
+    return Response(
+        content=ENVIRONMENTS_JSON,
+        media_type="application/json",
+        headers=ENVIRONMENTS_HEADERS,
+    )
 
 
 @router.post("/execute", response_model=ExecuteResponse)
 async def execute_code(request: ExecuteRequest):
     """
-    Execute code in a temporary container.
+    Execute code in a sandboxed container.
     
-    Creates a new container, executes the code, and removes the container.
-    Each request is completely isolated.
+    The worker takes a warm container from its pool (or creates one), runs
+    the code, then kills all processes and wipes the writable mounts before
+    reusing it. With WARM_POOL_SIZE=0 or READ_ONLY=false every request gets
+    a fresh container that is removed afterwards.
     """
-    # Validate environment
-    if request.environment not in settings.environments_list:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Invalid environment: {request.environment}. "
-                   f"Available: {settings.environments_list}"
-        )
+    # Environment is validated by ExecuteRequest
+    cache_key = None
+    if request.cache and settings.execution_cache_ttl > 0:
+        cache_key = _execution_cache_key(request)
 
     try:
-        # Execute code (creates container, runs code, removes container)
-        result = celery_app.send_task(
-            "app.worker.tasks.execute_code",
-            args=[request.environment, request.code, request.filename, request.stdin]
-        ).get(timeout=settings.execution_timeout + 30)
-
-        if not result.get("success", False):
-            return ExecuteResponse(
+        result = None
+        if cache_key:
+            result = await async_redis_client.get_cached_result(cache_key)
+
+        if result is None:
+            # Execute code in a warm or fresh container.
+            # Waiting on the result blocks, so keep it off the event loop.
+            result = await run_in_threadpool(
+                _run_execute_task,
+                [request.environment, request.code, request.filename, request.stdin]
+            )
+            # Worker marks results of timeouts, kills and Docker errors uncacheable
+            if cache_key and result.get("cacheable", False) and "error" not in result:
+                await async_redis_client.set_cached_result(
+                    cache_key, result, settings.execution_cache_ttl
+                )
+
+        # Skip model validation. Worker always sets stdout/stderr strings; the
+        # numbers are coerced so a malformed result fails here (500) instead
+        # of going out as an invalid response
+        g = result.get
+        if not g("success", False):
+            return ExecuteResponse.model_construct(
                 environment=request.environment,
-                stdout=result.get("stdout", ""),
-                stderr=result.get("stderr", result.get("error", "Execution failed")),
-                exit_code=result.get("exit_code", -1),
-                execution_time=result.get("execution_time", 0),
+                stdout=g("stdout", ""),
+                stderr=g("stderr", g("error", "Execution failed")),
+                exit_code=int(g("exit_code", -1)),
+                execution_time=float(g("execution_time", 0)),
                 status="error"
             )
 
-        return ExecuteResponse(
+        return ExecuteResponse.model_construct(
             environment=request.environment,
-            stdout=result.get("stdout", ""),
-            stderr=result.get("stderr", ""),
-            exit_code=result.get("exit_code", 0),
-            execution_time=result.get("execution_time", 0),
+            stdout=g("stdout", ""),
+            stderr=g("stderr", ""),
+            exit_code=int(g("exit_code", 0)),
+            execution_time=float(g("execution_time", 0)),
             status="completed"
         )
 
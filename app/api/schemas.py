@@ -1,10 +1,28 @@
-from pydantic import BaseModel, Field
-from typing import Optional
+from fastapi import HTTPException, status
+from pydantic import AfterValidator, BaseModel, Field
+from typing import Annotated, Optional
+
+
+def _validate_environment(value: str) -> str:
+    """Reject unknown or disabled environments with 400."""
+    # Imported here: app.config imports this module
+    from app.config import settings
+
+    if value not in settings.environments_set:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid environment: {value}. "
+                   f"Available: {settings.environments_list}"
+        )
+    return value
+
+
+ValidEnvironment = Annotated[str, AfterValidator(_validate_environment)]
 
 
 class ExecuteRequest(BaseModel):
     """Request to execute code"""
-    environment: str = Field(
+    environment: ValidEnvironment = Field(
         ...,
         description="Execution environment (e.g., 'python', 'python-ml', 'node', 'rust')"
     )
@@ -17,6 +35,11 @@ class ExecuteRequest(BaseModel):
         None,
         description="Optional filename for the code (e.g., 'main.py')"
     )
+    cache: bool = Field(
+        False,
+        description="Reuse the result of an identical earlier request. "
+                    "Only enable for deterministic code"
+    )
 
 
 class ExecuteResponse(BaseModel):
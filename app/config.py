@@ -10,11 +10,18 @@ import os
 import logging
 import yaml
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
 from dataclasses import dataclass, field
+from functools import lru_cache
 
 from app.api.schemas import EnvironmentResponse
 
+# Prefer libyaml's C loader, fall back to the pure-Python one
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
+
 
 logger = logging.getLogger(__name__)
 
@@ -82,6 +89,20 @@ class EnvironmentConfig:
     enabled: bool = True
     compile_command: Optional[str] = None
     
+    # Pre-tokenized run_command: (token, has_placeholders), built in __post_init__
+    _template_tokens: List[Tuple[str, bool]] = field(init=False, repr=False)
+    _is_shell: bool = field(init=False, repr=False)
+    
+    def __post_init__(self):
+        # If starts with "sh -c", keep the rest as single argument
+        self._is_shell = self.run_command.startswith("sh -c ")
+        if self._is_shell:
+            tokens = [self.run_command[6:].strip('"').strip("'")]
+        else:
+            tokens = self.run_command.split()
+        self._template_tokens = [(token, "{" in token) for token in tokens]
+        self._run_command_cache = lru_cache(maxsize=1024)(self._build_run_command)
+    
     def get_full_image_name(self, prefix: str) -> str:
         """Get full Docker image name with prefix."""
         return f"{prefix}-{self.image}"
@@ -95,21 +116,22 @@ class EnvironmentConfig:
           {filename} - Just the filename (e.g., main.py)
           {output_path} - Path without extension (e.g., /workspace/main)
         """
-        filename = os.path.basename(file_path)
-        output_path = file_path.rsplit('.', 1)[0] if '.' in file_path else file_path
-        
-        cmd = self.run_command.format(
-            file_path=file_path,
-            filename=filename,
-            output_path=output_path
+        return list(self._run_command_cache(file_path))
+    
+    def _build_run_command(self, file_path: str) -> Tuple[str, ...]:
+        """Substitute placeholders into the pre-tokenized run command."""
+        values = {
+            "file_path": file_path,
+            "filename": os.path.basename(file_path),
+            "output_path": file_path.rsplit('.', 1)[0] if '.' in file_path else file_path,
+        }
+        args = tuple(
+            token.format_map(values) if has_placeholders else token
+            for token, has_placeholders in self._template_tokens
         )
-        
-        # Parse command into list
-        # If starts with "sh -c", keep the rest as single argument
-        if cmd.startswith("sh -c "):
-            return ["sh", "-c", cmd[6:].strip('"').strip("'")]
-        
-        return cmd.split()
+        if self._is_shell:
+            return ("sh", "-c") + args
+        return args
 
 
 @dataclass
@@ -119,11 +141,14 @@ class Settings:
     redis_host: str
     redis_port: int
     redis_db: int
+    redis_url: Optional[str]
     
     # Celery
     celery_broker_url: str
     celery_result_backend: str
     celery_worker_concurrency: int
+    celery_worker_pool: str
+    celery_broker_pool_limit: int
     
     # Docker
     docker_socket: str
@@ -134,18 +159,23 @@ class Settings:
     container_cpu_limit: float
     container_pids_limit: int
     execution_timeout: int
+    execution_cache_ttl: int
+    max_output_bytes: int
     session_ttl: int
+    warm_pool_size: int
     
     # Security
     network_disabled: bool
     read_only: bool
     no_new_privileges: bool
     tmpfs_size: str
+    workspace_size: str
     
     # API
     api_host: str
     api_port: int
     api_debug: bool
+    api_threadpool_size: int
     
     # Environments
     environments: Dict[str, EnvironmentConfig] = field(default_factory=dict)
@@ -153,14 +183,27 @@ class Settings:
     workspace_dir: str = "/workspace"
     executor_user: str = "executor"
     
-    @property
-    def environments_list(self) -> List[str]:
-        """Get list of enabled environment names, description and file extension"""
-        return [
+    # Enabled environment names, computed once in __post_init__
+    _environments_list: List[str] = field(init=False, repr=False)
+    _environments_set: FrozenSet[str] = field(init=False, repr=False)
+    
+    def __post_init__(self):
+        self._environments_list = [
             name
             for name, env in self.environments.items()
             if env.enabled
         ]
+        self._environments_set = frozenset(self._environments_list)
+    
+    @property
+    def environments_list(self) -> List[str]:
+        """Get list of enabled environment names"""
+        return self._environments_list
+    
+    @property
+    def environments_set(self) -> FrozenSet[str]:
+        """Get set of enabled environment names for fast membership checks"""
+        return self._environments_set
     
     @property
     def environments_data(self) -> List[EnvironmentResponse]:
@@ -192,7 +235,7 @@ def _load_environments() -> tuple[Dict[str, EnvironmentConfig], Dict[str, Any]]:
     
     try:
         with open(path, 'r') as f:
-            config = yaml.safe_load(f) or {}
+            config = yaml.load(f, Loader=SafeLoader) or {}
         
         env_defs = config.get("environments", {})
         defaults = config.get("defaults", {})
@@ -220,8 +263,13 @@ def _load_environments() -> tuple[Dict[str, EnvironmentConfig], Dict[str, Any]]:
     return environments, defaults
 
 
+@lru_cache(maxsize=None)
 def load_settings() -> Settings:
-    """Load all settings from environment variables and environments.yaml."""
+    """
+    Load all settings from environment variables and environments.yaml.
+    
+    Cached: repeated calls return the same Settings instance.
+    """
     # Load environments from YAML
     environments, env_defaults = _load_environments()
     
@@ -231,11 +279,14 @@ def load_settings() -> Settings:
         redis_host=_env("REDIS_HOST", "redis"),
         redis_port=_env_int("REDIS_PORT", 6379),
         redis_db=_env_int("REDIS_DB", 0),
+        redis_url=_env("REDIS_URL") or None,
         
         # Celery
         celery_broker_url=_env("CELERY_BROKER_URL", "redis://redis:6379/0"),
         celery_result_backend=_env("CELERY_RESULT_BACKEND", "redis://redis:6379/0"),
         celery_worker_concurrency=_env_int("CELERY_WORKER_CONCURRENCY", 4),
+        celery_worker_pool=_env("CELERY_WORKER_POOL", "prefork"),
+        celery_broker_pool_limit=_env_int("CELERY_BROKER_POOL_LIMIT", 100),
         
         # Docker
         docker_socket=_env("DOCKER_SOCKET", "/var/run/docker.sock"),
@@ -246,18 +297,23 @@ def load_settings() -> Settings:
         container_cpu_limit=_env_float("CONTAINER_CPU_LIMIT", 0.5),
         container_pids_limit=_env_int("CONTAINER_PIDS_LIMIT", 50),
         execution_timeout=_env_int("EXECUTION_TIMEOUT", 30),
+        execution_cache_ttl=_env_int("EXECUTION_CACHE_TTL", 3600),
+        max_output_bytes=_env_int("MAX_OUTPUT_BYTES", 1048576),
         session_ttl=_env_int("SESSION_TTL", 3600),
+        warm_pool_size=_env_int("WARM_POOL_SIZE", 1),
         
         # Security
         network_disabled=_env_bool("NETWORK_DISABLED", True),
-        read_only=_env_bool("READ_ONLY", False),
+        read_only=_env_bool("READ_ONLY", True),
         no_new_privileges=_env_bool("NO_NEW_PRIVILEGES", True),
         tmpfs_size=_env("TMPFS_SIZE", "64m"),
+        workspace_size=_env("WORKSPACE_SIZE", "64m"),
         
         # API
         api_host=_env("API_HOST", "0.0.0.0"),
         api_port=_env_int("API_PORT", 8000),
         api_debug=_env_bool("API_DEBUG", False),
+        api_threadpool_size=_env_int("API_THREADPOOL_SIZE", 200),
         
         # Environments
         environments=environments,
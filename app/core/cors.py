@@ -0,0 +1,70 @@
+"""
+CORS middleware for the API.
+
+Allows any origin with credentials, any method and any header - the same
+policy as CORSMiddleware(allow_origins=["*"], allow_credentials=True, ...)
+but without its per-request header objects: preflights are answered
+directly and other responses get prebuilt header tuples appended.
+"""
+
+# Headers added to every preflight response, besides the echoed origin/headers
+PREFLIGHT_HEADERS = (
+    (b"access-control-allow-methods", b"DELETE, GET, HEAD, OPTIONS, PATCH, POST, PUT"),
+    (b"access-control-allow-credentials", b"true"),
+    (b"access-control-max-age", b"600"),
+    (b"vary", b"Origin"),
+)
+
+# Headers added to every other response to a cross-origin request
+RESPONSE_HEADERS = (
+    (b"access-control-allow-credentials", b"true"),
+    (b"vary", b"Origin"),
+)
+
+
+class FastCORSMiddleware:
+    """Pure ASGI CORS middleware allowing all origins with credentials."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        origin = None
+        request_method = None
+        request_headers = None
+        for name, value in scope["headers"]:
+            if name == b"origin":
+                origin = value
+            elif name == b"access-control-request-method":
+                request_method = value
+            elif name == b"access-control-request-headers":
+                request_headers = value
+
+        # Not a cross-origin request
+        if origin is None:
+            await self.app(scope, receive, send)
+            return
+
+        # Credentialed requests can't use "*", so always echo the origin
+        if scope["method"] == "OPTIONS" and request_method is not None:
+            headers = [(b"access-control-allow-origin", origin), *PREFLIGHT_HEADERS]
+            if request_headers is not None:
+                headers.append((b"access-control-allow-headers", request_headers))
+            await send({"type": "http.response.start", "status": 204, "headers": headers})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        async def send_with_cors(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [
+                    *message.get("headers", ()),
+                    (b"access-control-allow-origin", origin),
+                    *RESPONSE_HEADERS,
+                ]
+            await send(message)
+
+        await self.app(scope, receive, send_with_cors)
@@ -1,33 +1,80 @@
 """
-Redis client - Used by Celery for result backend.
+Redis clients for application caching (Celery manages its own connections).
 
-This module provides a simple Redis client that can be used
-for any future caching needs. Currently mainly used by Celery.
+  - async_redis_client: asyncio client used by the API for the execution
+    result cache (exec_cache:* keys)
+  - redis_client: sync client for code outside the event loop; currently
+    unused, kept for tooling and future needs
 """
 
+import socket
+
+import orjson
 import redis
-from typing import Optional
+import redis.asyncio
+from typing import Any, Dict, Optional
 
 from app.config import settings
 
 
+# TCP keepalive: first probe after 60s idle, then every 5s, drop after 3 misses.
+# Option names are platform-specific, so only set the ones available.
+SOCKET_KEEPALIVE_OPTIONS = {
+    getattr(socket, name): value
+    for name, value in (("TCP_KEEPIDLE", 60), ("TCP_KEEPINTVL", 5), ("TCP_KEEPCNT", 3))
+    if hasattr(socket, name)
+}
+
+# Connection pool options shared by sync and async clients
+POOL_KWARGS = dict(
+    decode_responses=True,
+    max_connections=64,
+    health_check_interval=30,
+)
+
+# Keepalive only applies to TCP connections, not unix:// sockets
+TCP_POOL_KWARGS = dict(
+    socket_keepalive=True,
+    socket_keepalive_options=SOCKET_KEEPALIVE_OPTIONS,
+)
+
+
+def _create_pool(pool_class):
+    """
+    Create connection pool from REDIS_URL if set, else REDIS_HOST/PORT/DB.
+    
+    REDIS_URL accepts redis://, rediss:// and unix:// (for co-located Redis).
+    """
+    url = settings.redis_url
+    if url:
+        kwargs = dict(POOL_KWARGS)
+        if not url.startswith("unix://"):
+            kwargs.update(TCP_POOL_KWARGS)
+        return pool_class.from_url(url, **kwargs)
+    return pool_class(
+        host=settings.redis_host,
+        port=settings.redis_port,
+        db=settings.redis_db,
+        **POOL_KWARGS,
+        **TCP_POOL_KWARGS,
+    )
+
+
+def _create_client() -> redis.Redis:
+    """Create Redis client backed by a shared connection pool."""
+    return redis.Redis(connection_pool=_create_pool(redis.ConnectionPool))
+
+
+def _create_async_client() -> redis.asyncio.Redis:
+    """Create asyncio Redis client backed by its own connection pool."""
+    return redis.asyncio.Redis(connection_pool=_create_pool(redis.asyncio.ConnectionPool))
+
+
 class RedisClient:
-    _instance: Optional['RedisClient'] = None
-    _client: Optional[redis.Redis] = None
-
-    def __new__(cls):
-        if cls._instance is None:
-            cls._instance = super().__new__(cls)
-        return cls._instance
-
-    def __init__(self):
-        if self._client is None:
-            self._client = redis.Redis(
-                host=settings.redis_host,
-                port=settings.redis_port,
-                db=settings.redis_db,
-                decode_responses=True
-            )
+    """Thin wrapper around a Redis client. Instantiated once at import."""
+
+    def __init__(self, client: redis.Redis):
+        self._client = client
 
     @property
     def client(self) -> redis.Redis:
@@ -41,4 +88,47 @@ class RedisClient:
             return False
 
 
-redis_client = RedisClient()
+class AsyncRedisClient:
+    """
+    Thin wrapper around an asyncio Redis client.
+    
+    Use from async API endpoints so Redis I/O doesn't block the event loop.
+    Synchronous code should use RedisClient instead.
+    """
+
+    def __init__(self, client: redis.asyncio.Redis):
+        self._client = client
+
+    @property
+    def client(self) -> redis.asyncio.Redis:
+        return self._client
+
+    async def ping(self) -> bool:
+        """Check if Redis is available."""
+        try:
+            return await self._client.ping()
+        except Exception:
+            return False
+
+    async def get_cached_result(self, key: str) -> Optional[Dict[str, Any]]:
+        """Get cached execution result, None on miss or Redis error."""
+        try:
+            cached = await self._client.get(f"exec_cache:{key}")
+        except Exception:
+            return None
+        return orjson.loads(cached) if cached is not None else None
+
+    async def set_cached_result(self, key: str, result: Dict[str, Any], ttl: int) -> None:
+        """Cache execution result for ttl seconds. Redis errors are ignored."""
+        try:
+            await self._client.setex(f"exec_cache:{key}", ttl, orjson.dumps(result))
+        except Exception:
+            pass
+
+    async def close(self) -> None:
+        """Close pooled connections."""
+        await self._client.aclose()
+
+
+redis_client = RedisClient(_create_client())
+async_redis_client = AsyncRedisClient(_create_async_client())
@@ -1,8 +1,26 @@
+import anyio.to_thread
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 
 from app.api.routes import router
 from app.config import settings
+from app.core.cors import FastCORSMiddleware
+from app.core.redis_client import async_redis_client
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Initialize services on startup, cleanup on shutdown"""
+    print("Code Executor API starting...")
+    # Blocking Celery waits run in the threadpool; size it for concurrent executes
+    anyio.to_thread.current_default_thread_limiter().total_tokens = settings.api_threadpool_size
+    print(f"Available environments: {settings.environments_list}")
+
+    yield
+
+    print("Code Executor API shutting down...")
+    await async_redis_client.close()
 
 
 app = FastAPI(
@@ -11,16 +29,13 @@ app = FastAPI(
     version="1.0.0",
     docs_url="/docs",
     redoc_url="/redoc",
+    # stdout/stderr can be large; orjson encodes them much faster than json
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan,
 )
 
 # CORS middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+app.add_middleware(FastCORSMiddleware)
 
 # Include API routes
 app.include_router(router)
@@ -34,17 +49,3 @@ async def root():
         "docs": "/docs",
         "health": "/api/v1/health",
     }
-
-
-@app.on_event("startup")
-async def startup_event():
-    """Initialize services on startup"""
-    print("Code Executor API starting...")
-    print(f"Available environments: {settings.environments_list}")
-
-
-@app.on_event("shutdown")
-async def shutdown_event():
-    """Cleanup on shutdown"""
-    print("Code Executor API shutting down...")
-
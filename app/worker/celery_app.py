@@ -1,6 +1,13 @@
 from celery import Celery
+from celery.signals import (
+    worker_init,
+    worker_process_init,
+    worker_process_shutdown,
+    worker_shutdown,
+)
 
 from app.config import settings
+from app.worker.docker_executor import docker_executor
 
 
 celery_app = Celery(
@@ -11,18 +18,32 @@ celery_app = Celery(
 )
 
 celery_app.conf.update(
-    task_serializer="json",
-    accept_content=["json"],
-    result_serializer="json",
+    # Code and stdout/stderr are large strings; msgpack is faster and smaller.
+    # json stays accepted for tasks already queued in json.
+    task_serializer="msgpack",
+    accept_content=["msgpack", "json"],
+    result_serializer="msgpack",
     timezone="UTC",
     enable_utc=True,
     task_track_started=True,
+    # The API reads results within seconds; let Redis expire them instead of keeping them for a day
+    result_expires=3600,
     task_time_limit=settings.execution_timeout + 30,
     task_soft_time_limit=settings.execution_timeout + 10,
+    # Execution times vary from milliseconds to execution_timeout: never
+    # prefetch work behind a running task. Workers also run with -Ofair
+    # (see docker-compose.yml) so tasks only go to idle processes.
     worker_prefetch_multiplier=1,
     worker_concurrency=settings.celery_worker_concurrency,
+    # "threads" lets one process overlap many executions waiting on Docker
+    worker_pool=settings.celery_worker_pool,
     task_acks_late=True,
     task_reject_on_worker_lost=True,
+    # Keep periodic cleanup from queueing behind long executions: the
+    # maintenance queue has its own worker (see docker-compose.yml)
+    task_routes={
+        "app.worker.tasks.cleanup_*": {"queue": "maintenance"},
+    },
 )
 
 celery_app.conf.beat_schedule = {
@@ -31,3 +52,23 @@ celery_app.conf.beat_schedule = {
         "schedule": 300.0,  # every 5 minutes
     },
 }
+
+
+@worker_init.connect
+def _ensure_images(**kwargs):
+    """Have all environment images locally before the worker starts taking tasks."""
+    docker_executor.ensure_images()
+
+
+@worker_process_init.connect
+def _init_docker(**kwargs):
+    """Connect to Docker and start filling warm pools once the worker process has forked."""
+    docker_executor.client
+    docker_executor.start_pool()
+
+
+@worker_process_shutdown.connect
+@worker_shutdown.connect
+def _drain_warm_pool(**kwargs):
+    """Remove this process's pooled containers on shutdown (child or threads-pool worker)."""
+    docker_executor.drain_pool()
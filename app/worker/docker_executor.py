@@ -6,12 +6,70 @@ environment definitions (images, commands, etc.)
 """
 
 import docker
+import io
+import queue
+import secrets
+import shlex
+import socket
+import tarfile
+import threading
 import time
-import uuid
-from typing import Dict, Any, Optional
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache
+from typing import Dict, Any, NamedTuple, Optional, Set
 from docker.errors import DockerException, NotFound, APIError
+from docker.utils.socket import STDOUT, frames_iter
 
-from app.config import settings
+from app.config import EnvironmentConfig, settings
+
+
+# Name of the file stdin data is written to inside the workspace
+STDIN_FILENAME = ".stdin"
+
+# How often the pool thread tops up warm pools, in seconds
+POOL_REFILL_INTERVAL = 1.0
+
+# Pooled containers are retired after this many seconds, so leftovers from
+# dead workers can be told apart from live pool members by age
+POOL_CONTAINER_MAX_AGE = 600
+
+# Wait this long before retrying an environment whose container failed to create
+POOL_RETRY_DELAY = 60.0
+
+# Seconds past the execution timeout before an output stream that is still
+# open is abandoned and its container killed
+KILL_GRACE = 5.0
+
+# Fails if any process besides PID 1 and the calling shell is left. PID 1
+# (sleep infinity) never reaps, so orphans killed by `kill -9 -1` stay as
+# zombies that count against pids_limit; such containers are not reused.
+NO_LEFTOVER_PROCESSES = (
+    'for p in /proc/[0-9]*; do case "${p#/proc/}" in 1|$$) ;; *) exit 1 ;; esac; done'
+)
+
+
+class EnvBundle(NamedTuple):
+    """Per-environment values resolved once from config."""
+    image_name: str
+    default_filename: str
+    config: Optional[EnvironmentConfig]
+
+
+@lru_cache(maxsize=None)
+def _env_bundle(environment: str) -> EnvBundle:
+    """Resolve environment config, with fallbacks for unknown environments."""
+    env_config = settings.get_environment(environment)
+    if env_config:
+        return EnvBundle(
+            image_name=env_config.get_full_image_name(settings.docker_image_prefix),
+            default_filename=env_config.default_filename,
+            config=env_config,
+        )
+    return EnvBundle(
+        image_name=f"{settings.docker_image_prefix}-{environment}",
+        default_filename="main.py",
+        config=None,
+    )
 
 
 class DockerExecutor:
@@ -19,35 +77,61 @@ class DockerExecutor:
     
     def __init__(self):
         self._client = None
+        # Idle warm containers per environment
+        self._pool: Dict[str, queue.Queue] = {}
+        # Containers returned after use, waiting to be scrubbed: (container_id, environment)
+        self._released: queue.Queue = queue.Queue()
+        self._pool_lock = threading.Lock()
+        self._pool_thread: Optional[threading.Thread] = None
+        self._pool_stop = threading.Event()
+        # Creation time (monotonic) of pooled containers, for retirement
+        self._created_at: Dict[str, float] = {}
+        # Containers killed from outside by _kill_processes, never reused
+        self._unusable: Set[str] = set()
 
     @property
     def client(self):
-        """Lazy initialization of Docker client."""
+        """Lazy initialization of Docker client, shared by all threads."""
         if self._client is None:
-            self._client = docker.from_env()
+            with self._pool_lock:
+                if self._client is None:
+                    # Keep enough pooled daemon connections for concurrent
+                    # executions plus the warm pool thread. from_env honours
+                    # DOCKER_HOST / DOCKER_TLS_VERIFY / DOCKER_CERT_PATH.
+                    self._client = docker.from_env(
+                        max_pool_size=settings.celery_worker_concurrency * 4,
+                    )
         return self._client
 
+    @property
+    def pool_size(self) -> int:
+        """
+        Warm containers kept per environment.
+        
+        Pooling needs a read-only rootfs: the scrub only wipes the tmpfs
+        mounts, so with a writable rootfs files could leak between users.
+        """
+        return settings.warm_pool_size if settings.read_only else 0
+
     def get_image_name(self, environment: str) -> str:
         """Get Docker image name for environment from config."""
-        env_config = settings.get_environment(environment)
-        if env_config:
-            return env_config.get_full_image_name(settings.docker_image_prefix)
-        # Fallback for unknown environments
-        return f"{settings.docker_image_prefix}-{environment}"
+        return _env_bundle(environment).image_name
 
     def get_default_filename(self, environment: str) -> str:
         """Get default filename for environment from config."""
-        env_config = settings.get_environment(environment)
-        if env_config:
-            return env_config.default_filename
-        return "main.py"
+        return _env_bundle(environment).default_filename
 
-    def create_container(self, session_id: Optional[str], environment: str) -> str:
+    def create_container(
+        self,
+        session_id: Optional[str],
+        environment: str,
+        pooled: bool = False
+    ) -> str:
         """Create a new container for code execution."""
         image_name = self.get_image_name(environment)
         
         # Generate unique container name
-        container_name = f"exec-{uuid.uuid4().hex[:12]}"
+        container_name = f"exec-{secrets.token_hex(6)}"
 
         try:
             container = self.client.containers.create(
@@ -55,6 +139,8 @@ class DockerExecutor:
                 name=container_name,
                 command=["sleep", "infinity"],
                 detach=True,
+                # Daemon removes the container once it exits, so stopping is a single kill
+                auto_remove=True,
                 mem_limit=settings.container_memory_limit,
                 cpu_period=100000,
                 cpu_quota=int(settings.container_cpu_limit * 100000),
@@ -67,10 +153,19 @@ class DockerExecutor:
                 labels={
                     "code-executor": "true",
                     "environment": environment,
+                    "code-executor-pool": "true" if pooled else "false",
+                },
+                # Keep writes off the overlay filesystem. The workspace must allow
+                # exec for compiled programs; mode 1777 because the executor's
+                # uid differs between images.
+                tmpfs={
+                    settings.workspace_dir: f"size={settings.workspace_size},mode=1777,exec,nosuid,nodev",
+                    "/tmp": f"size={settings.tmpfs_size},noexec,nosuid,nodev",
                 },
-                tmpfs={"/tmp": f"size={settings.tmpfs_size},noexec,nosuid,nodev"},
             )
             container.start()
+            if pooled:
+                self._created_at[container.id] = time.monotonic()
             return container.id
         except docker.errors.ImageNotFound:
             raise DockerException(
@@ -78,16 +173,190 @@ class DockerExecutor:
                 f"Please build it first using: docker build -t {image_name} environments/{environment}/"
             )
 
-    def stop_container(self, container_id: str) -> None:
-        """Stop and remove a container."""
+    def ensure_images(self) -> None:
+        """
+        Make sure images for all enabled environments are present, pulling missing ones.
+        
+        Uses its own short-lived client so nothing is shared with forked processes.
+        """
+        client = docker.from_env()
+
+        def ensure(environment: str) -> None:
+            image_name = self.get_image_name(environment)
+            try:
+                client.images.get(image_name)
+            except docker.errors.ImageNotFound:
+                print(f"Image '{image_name}' not found locally, pulling...")
+                try:
+                    client.images.pull(image_name)
+                except Exception as e:
+                    print(f"Error pulling image '{image_name}': {e}")
+
+        try:
+            with ThreadPoolExecutor(max_workers=4) as pool:
+                list(pool.map(ensure, settings.environments_list))
+        finally:
+            client.close()
+
+    def acquire(self, environment: str, fresh: bool = False) -> str:
+        """
+        Get a warm container for environment.
+        
+        Falls back to creating one if the pool is empty; fresh=True always
+        creates one. Return it with release() after use, or destroy it with
+        stop_container().
+        """
+        if self.pool_size <= 0:
+            return self.create_container(None, environment)
+        self.start_pool()
+        if fresh:
+            return self.create_container(None, environment, pooled=True)
+        pool = self._get_pool(environment)
+        while True:
+            try:
+                container_id = pool.get_nowait()
+            except queue.Empty:
+                return self.create_container(None, environment, pooled=True)
+            if not self._is_retired(container_id):
+                return container_id
+            # Let the pool thread remove it off the request path
+            self._released.put((container_id, environment))
+
+    def release(self, container_id: str, environment: str) -> None:
+        """Hand a used container back to the pool thread for scrubbing and reuse."""
+        if self.pool_size <= 0 or container_id in self._unusable:
+            self.stop_container(container_id)
+            return
+        self._released.put((container_id, environment))
+
+    def start_pool(self) -> None:
+        """Start the pool thread if warm pools are enabled. Safe to call repeatedly."""
+        if self.pool_size <= 0 or self._pool_thread is not None:
+            return
+        with self._pool_lock:
+            if self._pool_thread is None:
+                self._pool_stop.clear()
+                self._pool_thread = threading.Thread(
+                    target=self._pool_loop, name="warm-pool", daemon=True
+                )
+                self._pool_thread.start()
+
+    def drain_pool(self) -> None:
+        """Stop the pool thread and remove all idle and released containers."""
+        self._pool_stop.set()
+        if self._pool_thread is not None:
+            self._pool_thread.join(timeout=10)
+            self._pool_thread = None
+        while True:
+            try:
+                container_id, _ = self._released.get_nowait()
+            except queue.Empty:
+                break
+            self.stop_container(container_id)
+        for pool in self._pool.values():
+            while True:
+                try:
+                    container_id = pool.get_nowait()
+                except queue.Empty:
+                    break
+                self.stop_container(container_id)
+
+    def _get_pool(self, environment: str) -> queue.Queue:
+        pool = self._pool.get(environment)
+        if pool is None:
+            pool = self._pool.setdefault(environment, queue.Queue())
+        return pool
+
+    def _pool_loop(self) -> None:
+        """Scrub released containers back into pools and top pools up."""
+        retry_at: Dict[str, float] = {}
+        while not self._pool_stop.is_set():
+            # Retire idle containers here, so top-up replaces them ahead of
+            # the next acquire() instead of on the request path
+            for environment, pool in list(self._pool.items()):
+                for _ in range(pool.qsize()):
+                    try:
+                        container_id = pool.get_nowait()
+                    except queue.Empty:
+                        break
+                    if self._is_retired(container_id):
+                        self._released.put((container_id, environment))
+                    else:
+                        pool.put(container_id)
+
+            while True:
+                try:
+                    container_id, environment = self._released.get_nowait()
+                except queue.Empty:
+                    break
+                self._recycle(container_id, environment)
+
+            for environment in settings.environments_list:
+                if retry_at.get(environment, 0) > time.monotonic():
+                    continue
+                pool = self._get_pool(environment)
+                while pool.qsize() < self.pool_size and not self._pool_stop.is_set():
+                    try:
+                        pool.put(self.create_container(None, environment, pooled=True))
+                    except Exception as e:
+                        print(f"Error filling warm pool for {environment}: {e}")
+                        retry_at[environment] = time.monotonic() + POOL_RETRY_DELAY
+                        break
+
+            self._pool_stop.wait(POOL_REFILL_INTERVAL)
+
+    def _is_retired(self, container_id: str) -> bool:
+        created_at = self._created_at.get(container_id)
+        return created_at is None or time.monotonic() - created_at >= POOL_CONTAINER_MAX_AGE
+
+    def _recycle(self, container_id: str, environment: str) -> None:
+        """Return container to its pool if it scrubs cleanly, otherwise destroy it."""
+        pool = self._get_pool(environment)
+        if pool.qsize() >= self.pool_size or self._is_retired(container_id):
+            self.stop_container(container_id)
+            return
+        ws = settings.workspace_dir
+        # Kill everything but PID 1 (sleep infinity), wipe every writable
+        # mount (workspace, /tmp, Docker's /dev/shm, POSIX message queues)
+        # and remove SysV IPC objects, which live in the container's IPC
+        # namespace. Any failure discards the container.
+        wipe = " ".join(
+            f"{d}/* {d}/.[!.]* {d}/..?*" for d in (ws, "/tmp", "/dev/shm", "/dev/mqueue")
+        )
+        scrub = f"kill -9 -1; rm -rf {wipe} && ipcrm -a && {NO_LEFTOVER_PROCESSES}"
         try:
             container = self.client.containers.get(container_id)
-            container.stop(timeout=5)
-            container.remove(force=True)
+            result = container.exec_run(["sh", "-c", scrub], user=settings.executor_user)
+            if result.exit_code != 0:
+                raise DockerException(f"scrub exited with {result.exit_code}")
+        except Exception as e:
+            print(f"Discarding container {container_id}: {e}")
+            self.stop_container(container_id)
+            return
+        pool.put(container_id)
+
+    def stop_container(self, container_id: str) -> None:
+        """
+        Stop and remove a container.
+        
+        Containers only run sleep infinity, so this just sends SIGKILL;
+        they are created with auto_remove and the daemon removes them in
+        the background.
+        """
+        self._created_at.pop(container_id, None)
+        self._unusable.discard(container_id)
+        try:
+            self.client.api.kill(container_id)
         except NotFound:
             pass
-        except APIError as e:
-            print(f"Error stopping container {container_id}: {e}")
+        except APIError:
+            # Not running (e.g. start failed), so auto_remove won't fire
+            try:
+                self.client.api.remove_container(container_id, v=True, force=True)
+            except NotFound:
+                pass
+            except APIError as e:
+                print(f"Error stopping container {container_id}: {e}")
 
     def execute_code(
         self,
@@ -101,77 +370,84 @@ class DockerExecutor:
         if filename is None:
             filename = self.get_default_filename(environment)
 
+        started = False
         try:
-            container = self.client.containers.get(container_id)
-
-            # Write code to container
-            file_path = f"{settings.workspace_dir}/{filename}"
-            write_result = container.exec_run(
-                cmd=["sh", "-c", f"cat > {file_path}"],
-                stdin=True,
-                socket=True,
-                user=settings.executor_user
-            )
-            sock = write_result.output
-            sock._sock.sendall(code.encode("utf-8"))
-            sock._sock.close()
-
-            # Small delay to ensure file is written
-            time.sleep(0.1)
+            # Code (and stdin) are sent as a tar archive on the exec's stdin
+            # and extracted right before the program starts: one exec per run
+            workspace = settings.workspace_dir
+            file_path = f"{workspace}/{filename}"
+            files = {filename: code}
+            if stdin_data:
+                files[STDIN_FILENAME] = stdin_data
+            archive = self._build_archive(files)
 
             # Get run command from config
             run_cmd = self._get_run_command(environment, file_path)
 
-            # Execute code with timeout
-            start_time = time.time()
-            
+            run = f"exec {shlex.join(run_cmd)}"
             if stdin_data:
-                # Write stdin data to a temporary file
-                stdin_file = f"{settings.workspace_dir}/.stdin"
-                stdin_write = container.exec_run(
-                    cmd=["sh", "-c", f"cat > {stdin_file}"],
-                    stdin=True,
-                    socket=True,
-                    user=settings.executor_user
-                )
-                stdin_sock = stdin_write.output
-                stdin_sock._sock.sendall(stdin_data.encode("utf-8"))
-                stdin_sock._sock.close()
-                time.sleep(0.05)
-                
                 # Execute with stdin from file
-                run_cmd_str = " ".join(run_cmd)
-                exec_result = container.exec_run(
-                    cmd=["sh", "-c", f"timeout {settings.execution_timeout} sh -c '{run_cmd_str} < {stdin_file}'"],
-                    demux=True,
-                    user=settings.executor_user
-                )
-            else:
-                exec_result = container.exec_run(
-                    cmd=["timeout", str(settings.execution_timeout)] + run_cmd,
-                    demux=True,
-                    user=settings.executor_user
-                )
-            
-            execution_time = time.time() - start_time
+                stdin_file = f"{workspace}/{STDIN_FILENAME}"
+                run += f" < {shlex.quote(stdin_file)}"
+            cmd = ["sh", "-c", f"tar -xf - -C {shlex.quote(workspace)} && {run}"]
+
+            exec_id = self.client.api.exec_create(
+                container_id, cmd=cmd, stdin=True, user=settings.executor_user
+            )["Id"]
+            started = True
+
+            # Kill the program from the worker if it runs past the timeout
+            timed_out = threading.Event()
+
+            def on_timeout():
+                timed_out.set()
+                self._kill_processes(container_id)
 
-            stdout = exec_result.output[0] or b""
-            stderr = exec_result.output[1] or b""
-            exit_code = exec_result.exit_code
+            watchdog = threading.Timer(settings.execution_timeout, on_timeout)
+            watchdog.daemon = True
+            start_time = time.perf_counter()
+            watchdog.start()
+            try:
+                stdout, stderr, truncated = self._stream_output(container_id, exec_id, archive)
+            finally:
+                watchdog.cancel()
+                # A kill already in flight must finish before the container is reused
+                watchdog.join()
+            execution_time = time.perf_counter() - start_time
 
-            # Handle timeout exit code (124 from timeout command)
-            if exit_code == 124:
+            if container_id in self._unusable:
+                # Whole container was killed, it may already be gone
+                exit_code = 137
+            else:
+                exit_code = self.client.api.exec_inspect(exec_id)["ExitCode"]
+            killed = exit_code == 137  # SIGKILL
+
+            if truncated:
+                stderr += f"\nOutput limit of {settings.max_output_bytes} bytes exceeded\n".encode()
+            elif killed and timed_out.is_set():
+                # Keep the exit code clients got from the timeout command
+                exit_code = 124
                 stderr = b"Execution timed out\n" + stderr
+            elif killed:
+                stderr = b"Process killed (memory limit exceeded?)\n" + stderr
 
             return {
                 "stdout": stdout.decode("utf-8", errors="replace"),
                 "stderr": stderr.decode("utf-8", errors="replace"),
                 "exit_code": exit_code,
                 "execution_time": round(execution_time, 3),
+                # Only a program's own exit is worth caching, not a kill or
+                # an exit code Docker couldn't report
+                "cacheable": isinstance(exit_code, int) and not (truncated or killed),
             }
 
+        # Docker failures, not the program's: "error" tells the caller the
+        # container is in an unknown state and must not be reused
         except NotFound:
             return {
+                "error": "Container not found.",
+                # Nothing ran yet, so the caller may retry in another container
+                "container_missing": not started,
                 "stdout": "",
                 "stderr": "Container not found.",
                 "exit_code": -1,
@@ -179,12 +455,112 @@ class DockerExecutor:
             }
         except Exception as e:
             return {
+                "error": f"Execution error: {str(e)}",
                 "stdout": "",
                 "stderr": f"Execution error: {str(e)}",
                 "exit_code": -1,
                 "execution_time": 0,
             }
 
+    def _stream_output(self, container_id: str, exec_id: str, stdin: bytes) -> tuple:
+        """
+        Start exec, send stdin, then read output as it arrives, keeping at
+        most max_output_bytes.
+        
+        When the limit is hit the container's processes are killed.
+        Returns (stdout, stderr, truncated).
+        """
+        limit = settings.max_output_bytes
+        stdout_chunks, stderr_chunks = [], []
+        total = 0
+        truncated = False
+        sock = self.client.api.exec_start(exec_id, socket=True)
+        # frames_iter polls without a timeout, so a socket timeout never fires.
+        # If the stream outlives the timeout kill (threads pool has no task
+        # time limit), kill the container and shut the socket down.
+        deadline = threading.Timer(
+            settings.execution_timeout + KILL_GRACE,
+            self._abandon_stream,
+            (container_id, sock._sock),
+        )
+        deadline.daemon = True
+        deadline.start()
+        try:
+            sock._sock.sendall(stdin)
+            # Close our write side so the container sees EOF on stdin
+            sock._sock.shutdown(socket.SHUT_WR)
+            for stream, chunk in frames_iter(sock, tty=False):
+                if truncated:
+                    # Drain until the killed process closes the stream
+                    continue
+                chunks = stdout_chunks if stream == STDOUT else stderr_chunks
+                chunks.append(chunk[:max(limit - total, 0)])
+                total += len(chunk)
+                if total > limit:
+                    truncated = True
+                    self._kill_processes(container_id)
+        finally:
+            deadline.cancel()
+            deadline.join()
+            sock._sock.close()
+        return b"".join(stdout_chunks), b"".join(stderr_chunks), truncated
+
+    def _abandon_stream(self, container_id: str, sock: socket.socket) -> None:
+        """Kill the container and unblock the reader of its exec stream."""
+        print(f"Output stream of {container_id} still open after kill, killing container")
+        self._unusable.add(container_id)
+        try:
+            self.client.api.kill(container_id)
+        except (NotFound, APIError):
+            pass
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+    def _kill_processes(self, container_id: str) -> None:
+        """
+        Kill every process in the container except PID 1 (sleep infinity).
+        
+        Needs a new exec inside the container. If that can't start (e.g. a
+        fork bomb used up pids_limit), the whole container is killed instead
+        and marked unusable.
+        """
+        try:
+            exec_id = self.client.api.exec_create(
+                container_id, cmd=["sh", "-c", "kill -9 -1; exit 0"], user=settings.executor_user
+            )["Id"]
+            self.client.api.exec_start(exec_id)
+            exit_code = self.client.api.exec_inspect(exec_id)["ExitCode"]
+            if exit_code == 0:
+                return
+            error = f"kill exec exited with {exit_code}"
+        except Exception as e:
+            error = str(e)
+        print(f"Error killing processes in {container_id}: {error}, killing container")
+        self._unusable.add(container_id)
+        try:
+            self.client.api.kill(container_id)
+        except NotFound:
+            pass
+        except APIError as e:
+            print(f"Error killing container {container_id}: {e}")
+
+    @staticmethod
+    def _build_archive(files: Dict[str, str]) -> bytes:
+        """Build an in-memory tar archive from {filename: content}."""
+        buf = io.BytesIO()
+        now = time.time()
+        with tarfile.open(fileobj=buf, mode="w") as tar:
+            for name, content in files.items():
+                data = content.encode("utf-8")
+                info = tarfile.TarInfo(name=name)
+                info.size = len(data)
+                info.mode = 0o644
+                info.mtime = now
+                tar.addfile(info, io.BytesIO(data))
+        return buf.getvalue()
+
     def _get_run_command(self, environment: str, file_path: str) -> list:
         """
         Get the run command for the environment from config.
@@ -192,7 +568,7 @@ class DockerExecutor:
         The command is defined in config/environments.yaml and supports
         placeholders: {file_path}, {filename}, {output_path}
         """
-        env_config = settings.get_environment(environment)
+        env_config = _env_bundle(environment).config
         if env_config:
             return env_config.get_run_command(file_path)
         
@@ -208,24 +584,58 @@ class DockerExecutor:
             return False
 
     def cleanup_orphaned_containers(self) -> list:
-        """Remove all code-executor containers."""
+        """
+        Remove code-executor containers left behind by dead workers.
+        
+        Decides from a single container listing: ephemeral containers older
+        than the task time limit and pool containers past their maximum
+        age can no longer belong to a live task or pool.
+        """
         cleaned = []
+        now = time.time()
+        max_task_time = settings.execution_timeout + 30
         try:
-            containers = self.client.containers.list(
+            # Raw listing: containers.list() would inspect every container
+            containers = self.client.api.containers(
                 all=True,
                 filters={"label": "code-executor=true"}
             )
+            orphaned = []
             for container in containers:
-                try:
-                    container.stop(timeout=5)
-                    container.remove(force=True)
-                    cleaned.append(container.id)
-                except Exception:
-                    pass
+                labels = container.get("Labels") or {}
+                max_age = max_task_time
+                if labels.get("code-executor-pool") == "true":
+                    max_age += POOL_CONTAINER_MAX_AGE
+                if now - container.get("Created", now) >= max_age:
+                    orphaned.append(container["Id"])
+
+            if not orphaned:
+                return cleaned
+            with ThreadPoolExecutor(max_workers=16) as pool:
+                futures = {
+                    pool.submit(self._remove_container, container_id): container_id
+                    for container_id in orphaned
+                }
+                for future in as_completed(futures):
+                    if future.result():
+                        cleaned.append(futures[future])
         except Exception as e:
             print(f"Error during cleanup: {e}")
         return cleaned
 
+    def _remove_container(self, container_id: str) -> bool:
+        """Force-remove container (kill + remove in one request). True if it is gone."""
+        try:
+            self.client.api.remove_container(container_id, v=True, force=True)
+        except NotFound:
+            pass
+        except APIError as e:
+            # 409: auto_remove is already removing it
+            if e.status_code != 409:
+                print(f"Error removing container {container_id}: {e}")
+                return False
+        return True
+
 
 # Lazy singleton - won't connect to Docker until first use
 docker_executor = DockerExecutor()
@@ -13,27 +13,44 @@ def execute_code(
     stdin_data: str = None
 ) -> Dict[str, Any]:
     """
-    Execute code in a temporary container.
+    Execute code in a warm container from the pool.
     
-    Creates container -> executes code -> removes container.
+    Acquires container -> executes code -> releases it back to the pool.
+    Containers that hit an error are removed instead of reused.
     """
     container_id = None
+    reusable = False
     
     try:
-        # Create container
-        container_id = docker_executor.create_container(
-            session_id=None,  # No session needed
-            environment=environment
-        )
+        for attempt in range(2):
+            # Get warm container (created on demand if the pool is empty)
+            container_id = docker_executor.acquire(environment, fresh=attempt > 0)
 
-        # Execute code
-        result = docker_executor.execute_code(
-            container_id=container_id,
-            code=code,
-            environment=environment,
-            filename=filename,
-            stdin_data=stdin_data
-        )
+            # Execute code
+            result = docker_executor.execute_code(
+                container_id=container_id,
+                code=code,
+                environment=environment,
+                filename=filename,
+                stdin_data=stdin_data
+            )
+            if not result.get("container_missing"):
+                break
+            # Pooled container died (auto_remove'd after OOM, daemon
+            # restart, ...) before the run started: retry once in a new one
+            docker_executor.stop_container(container_id)
+            container_id = None
+        if "error" in result:
+            # Docker failed rather than the program, so don't reuse the container
+            return {
+                "success": False,
+                "error": result["error"],
+                "stdout": result["stdout"],
+                "stderr": result["stderr"],
+                "exit_code": -1,
+                "execution_time": 0,
+            }
+        reusable = True
 
         return {
             "success": True,
@@ -41,6 +58,7 @@ def execute_code(
             "stderr": result["stderr"],
             "exit_code": result["exit_code"],
             "execution_time": result["execution_time"],
+            "cacheable": result["cacheable"],
         }
 
     except Exception as e:
@@ -54,10 +72,13 @@ def execute_code(
         }
     
     finally:
-        # Always cleanup container
+        # Always give the container back or clean it up
         if container_id:
             try:
-                docker_executor.stop_container(container_id)
+                if reusable:
+                    docker_executor.release(container_id, environment)
+                else:
+                    docker_executor.stop_container(container_id)
             except Exception:
                 pass
 